@@ -7,9 +7,79 @@ Modulo per generare output JSON strutturato dai parametri estratti.
 
 import json
 import os
+import re
 from datetime import datetime
 from typing import Dict, Optional, Any
-from parameter_extractor import ParameterExtractor
+from parameter_extractor import get_extractor
+
+try:
+    import orjson
+except ImportError:  # orjson è opzionale: si usa il modulo json standard
+    orjson = None
+
+
+def dumps_json(data: Any) -> bytes:
+    """
+    Serializza i dati in JSON UTF-8 indentato.
+    
+    Usa orjson (encoder nativo, molto più veloce) se installato,
+    altrimenti il modulo json standard con lo stesso formato.
+    
+    Args:
+        data (Any): Dati da serializzare
+        
+    Returns:
+        bytes: JSON codificato in UTF-8
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _sample(text: str, length: int = 500) -> str:
+    """Restituisce i primi caratteri del testo, con "..." se troncato."""
+    return f"{text[:length]}..." if len(text) > length else text
+
+
+# Valori numerici iniziali dei parametri formattati (es. "76 bpm", "36.7");
+# i valori vengono dall'estrattore e sono ASCII, da cui re.ASCII
+_LEADING_INT = re.compile(r'\s*(-?\d+)(?!\S)', re.ASCII)
+_LEADING_FLOAT = re.compile(r'\s*(-?\d+(?:\.\d*)?)(?!\S)', re.ASCII)
+_BLOOD_PRESSURE = re.compile(r'\s*(\d+)\s*/\s*(\d+)', re.ASCII)
+
+# Template statico di "vital_parameters": (nome output, chiave parametro, unità, intervallo normale)
+_VITAL_PARAMETERS = (
+    ("blood_pressure", "blood_pressure", "mmHg", "90-120/60-80 mmHg"),
+    ("heart_rate", "heart_rate", "bpm", "60-100 bpm"),
+    ("glucose", "glucose", "mg/dL", "70-100 mg/dL (fasting)"),
+    ("oxygen_saturation", "saturation", "%", "95-100%"),
+    ("body_temperature", "temperature", "°C", "36.1-37.2°C"),
+    ("weight", "weight", "kg", "varies by height/age"),
+    ("height", "height", "cm", "varies by age/gender"),
+    ("bmi", "bmi", "kg/m²", "18.5-24.9"),
+)
+
+# Raccomandazioni per ciascun fattore di rischio (nell'ordine in cui vengono riportate)
+_FACTOR_RECOMMENDATIONS = {
+    "Ipertensione": [
+        "Consultare un medico per la pressione alta",
+        "Ridurre il consumo di sale"
+    ],
+    "Glicemia elevata": [
+        "Controllo diabetologico",
+        "Monitoraggio glicemia regolare"
+    ],
+    "Saturazione ossigeno bassa": [
+        "Consulenza medica urgente"
+    ],
+    "Febbre": [
+        "Monitoraggio temperatura",
+        "Idratazione adeguata"
+    ],
+    "BMI anomalo": [
+        "Consulenza nutrizionale"
+    ],
+}
 
 
 class JSONOutputGenerator:
@@ -17,16 +87,25 @@ class JSONOutputGenerator:
     Classe per generare output JSON strutturato dai parametri vitali estratti.
     """
     
-    def __init__(self):
-        """Inizializza il generatore JSON."""
-        self.parameter_extractor = ParameterExtractor()
+    def __init__(self, include_text_samples: bool = True):
+        """
+        Inizializza il generatore JSON.
+        
+        Args:
+            include_text_samples (bool): Se False, omette dall'output gli
+                estratti del testo grezzo e pulito (report più compatti)
+        """
+        self.parameter_extractor = get_extractor()
+        self.include_text_samples = include_text_samples
     
     def generate_output(
         self, 
         file_path: str, 
         raw_text: str, 
         cleaned_text: str, 
-        parameters: Dict[str, Optional[str]]
+        parameters: Dict[str, Optional[str]],
+        stat_result: Optional[os.stat_result] = None,
+        file_ext: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Genera l'output JSON strutturato completo.
@@ -36,10 +115,16 @@ class JSONOutputGenerator:
             raw_text (str): Testo grezzo dall'OCR
             cleaned_text (str): Testo pulito
             parameters (Dict): Parametri estratti
+            stat_result (os.stat_result, optional): Stat del file già nota,
+                evita una nuova chiamata a os.stat
+            file_ext (str, optional): Estensione in minuscolo già calcolata
             
         Returns:
             Dict: Output JSON strutturato
         """
+        # Un'unica lettura dell'orologio per tutto il report
+        timestamp = datetime.now().isoformat()
+        
         # Calcola BMI se possibile
         bmi = self.parameter_extractor.calculate_bmi(
             parameters.get('weight'), 
@@ -49,13 +134,27 @@ class JSONOutputGenerator:
             parameters['bmi'] = bmi
         
         # Genera metadati file
-        file_info = self._get_file_info(file_path)
+        file_info = self._get_file_info(file_path, stat_result, file_ext)
         
         # Genera statistiche estrazione
         extraction_stats = self.parameter_extractor.get_extraction_stats(parameters)
         
+        # Classifica ogni parametro una sola volta
+        statuses = self._classify_all(parameters)
+        
         # Genera classificazione rischio (bonus)
-        risk_assessment = self._assess_risk(parameters)
+        risk_assessment = self._assess_risk(parameters, statuses)
+        
+        # Parametri vitali: la parte statica (unità, intervalli) viene dal template
+        vital_parameters = {
+            name: {
+                "value": parameters.get(key),
+                "unit": unit,
+                "normal_range": normal_range,
+                "status": statuses.get(key, "unknown")
+            }
+            for name, key, unit, normal_range in _VITAL_PARAMETERS
+        }
         
         # Struttura output principale
         output = {
@@ -64,7 +163,7 @@ class JSONOutputGenerator:
                 "file_name": os.path.basename(file_path),
                 "file_size_bytes": file_info["size"],
                 "file_extension": file_info["extension"],
-                "processing_timestamp": datetime.now().isoformat(),
+                "processing_timestamp": timestamp,
                 "processor_version": "1.0"
             },
             "extraction_info": {
@@ -75,70 +174,30 @@ class JSONOutputGenerator:
                 "text_length_cleaned": len(cleaned_text),
                 "processing_status": "success"
             },
-            "vital_parameters": {
-                "blood_pressure": {
-                    "value": parameters.get('blood_pressure'),
-                    "unit": "mmHg",
-                    "normal_range": "90-120/60-80 mmHg",
-                    "status": self._classify_blood_pressure(parameters.get('blood_pressure'))
-                },
-                "heart_rate": {
-                    "value": parameters.get('heart_rate'),
-                    "unit": "bpm",
-                    "normal_range": "60-100 bpm",
-                    "status": self._classify_heart_rate(parameters.get('heart_rate'))
-                },
-                "glucose": {
-                    "value": parameters.get('glucose'),
-                    "unit": "mg/dL",
-                    "normal_range": "70-100 mg/dL (fasting)",
-                    "status": self._classify_glucose(parameters.get('glucose'))
-                },
-                "oxygen_saturation": {
-                    "value": parameters.get('saturation'),
-                    "unit": "%",
-                    "normal_range": "95-100%",
-                    "status": self._classify_saturation(parameters.get('saturation'))
-                },
-                "body_temperature": {
-                    "value": parameters.get('temperature'),
-                    "unit": "°C",
-                    "normal_range": "36.1-37.2°C",
-                    "status": self._classify_temperature(parameters.get('temperature'))
-                },
-                "weight": {
-                    "value": parameters.get('weight'),
-                    "unit": "kg",
-                    "normal_range": "varies by height/age",
-                    "status": "unknown"
-                },
-                "height": {
-                    "value": parameters.get('height'),
-                    "unit": "cm",
-                    "normal_range": "varies by age/gender",
-                    "status": "unknown"
-                },
-                "bmi": {
-                    "value": parameters.get('bmi'),
-                    "unit": "kg/m²",
-                    "normal_range": "18.5-24.9",
-                    "status": self._classify_bmi(parameters.get('bmi'))
-                }
-            },
-            "risk_assessment": risk_assessment,
-            "raw_text_sample": raw_text[:500] + "..." if len(raw_text) > 500 else raw_text,
-            "cleaned_text_sample": cleaned_text[:500] + "..." if len(cleaned_text) > 500 else cleaned_text
+            "vital_parameters": vital_parameters,
+            "risk_assessment": risk_assessment
         }
         
+        if self.include_text_samples:
+            output["raw_text_sample"] = _sample(raw_text)
+            output["cleaned_text_sample"] = _sample(cleaned_text)
+        
         return output
     
-    def _get_file_info(self, file_path: str) -> Dict[str, Any]:
-        """Ottiene informazioni sul file."""
+    def _get_file_info(
+        self,
+        file_path: str,
+        stat_result: Optional[os.stat_result] = None,
+        file_ext: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Ottiene informazioni sul file (usa stat_result e file_ext se già disponibili)."""
         try:
-            stat = os.stat(file_path)
+            stat = stat_result if stat_result is not None else os.stat(file_path)
+            if file_ext is None:
+                file_ext = os.path.splitext(file_path)[1].lower()
             return {
                 "size": stat.st_size,
-                "extension": os.path.splitext(file_path)[1].lower(),
+                "extension": file_ext,
                 "last_modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
             }
         except OSError:
@@ -148,124 +207,141 @@ class JSONOutputGenerator:
                 "last_modified": None
             }
     
+    def _classify_all(self, parameters: Dict[str, Optional[str]]) -> Dict[str, str]:
+        """Classifica tutti i parametri vitali che hanno un intervallo di riferimento."""
+        return {
+            'blood_pressure': self._classify_blood_pressure(parameters.get('blood_pressure')),
+            'heart_rate': self._classify_heart_rate(parameters.get('heart_rate')),
+            'glucose': self._classify_glucose(parameters.get('glucose')),
+            'saturation': self._classify_saturation(parameters.get('saturation')),
+            'temperature': self._classify_temperature(parameters.get('temperature')),
+            'bmi': self._classify_bmi(parameters.get('bmi'))
+        }
+    
     def _classify_blood_pressure(self, bp: Optional[str]) -> str:
         """Classifica la pressione arteriosa."""
         if not bp:
             return "unknown"
         
-        try:
-            systolic, diastolic = map(int, bp.split('/')[0:2])
-            
-            if systolic < 90 or diastolic < 60:
-                return "low"
-            elif systolic <= 120 and diastolic <= 80:
-                return "normal"
-            elif systolic <= 129 and diastolic <= 80:
-                return "elevated"
-            elif systolic <= 139 or diastolic <= 89:
-                return "high_stage1"
-            else:
-                return "high_stage2"
-        except (ValueError, IndexError):
+        match = _BLOOD_PRESSURE.match(bp)
+        if not match:
             return "invalid"
+        systolic, diastolic = int(match.group(1)), int(match.group(2))
+        
+        if systolic < 90 or diastolic < 60:
+            return "low"
+        elif systolic <= 120 and diastolic <= 80:
+            return "normal"
+        elif systolic <= 129 and diastolic <= 80:
+            return "elevated"
+        elif systolic <= 139 or diastolic <= 89:
+            return "high_stage1"
+        else:
+            return "high_stage2"
     
     def _classify_heart_rate(self, hr: Optional[str]) -> str:
         """Classifica la frequenza cardiaca."""
         if not hr:
             return "unknown"
         
-        try:
-            rate = int(hr.split()[0])
-            
-            if rate < 60:
-                return "low"
-            elif 60 <= rate <= 100:
-                return "normal"
-            else:
-                return "high"
-        except (ValueError, IndexError):
+        match = _LEADING_INT.match(hr)
+        if not match:
             return "invalid"
+        rate = int(match.group(1))
+        
+        if rate < 60:
+            return "low"
+        elif 60 <= rate <= 100:
+            return "normal"
+        else:
+            return "high"
     
     def _classify_glucose(self, glucose: Optional[str]) -> str:
         """Classifica la glicemia."""
         if not glucose:
             return "unknown"
         
-        try:
-            value = int(glucose.split()[0])
-            
-            if value < 70:
-                return "low"
-            elif 70 <= value <= 100:
-                return "normal"
-            elif 101 <= value <= 125:
-                return "prediabetes"
-            else:
-                return "diabetes"
-        except (ValueError, IndexError):
+        match = _LEADING_INT.match(glucose)
+        if not match:
             return "invalid"
+        value = int(match.group(1))
+        
+        if value < 70:
+            return "low"
+        elif 70 <= value <= 100:
+            return "normal"
+        elif 101 <= value <= 125:
+            return "prediabetes"
+        else:
+            return "diabetes"
     
     def _classify_saturation(self, sat: Optional[str]) -> str:
         """Classifica la saturazione di ossigeno."""
         if not sat:
             return "unknown"
         
-        try:
-            value = int(sat.replace('%', ''))
-            
-            if value < 90:
-                return "critical"
-            elif 90 <= value < 95:
-                return "low"
-            else:
-                return "normal"
-        except (ValueError, IndexError):
+        match = _LEADING_INT.match(sat.replace('%', ''))
+        if not match:
             return "invalid"
+        value = int(match.group(1))
+        
+        if value < 90:
+            return "critical"
+        elif 90 <= value < 95:
+            return "low"
+        else:
+            return "normal"
     
     def _classify_temperature(self, temp: Optional[str]) -> str:
         """Classifica la temperatura corporea."""
         if not temp:
             return "unknown"
         
-        try:
-            value = float(temp.replace('°C', ''))
-            
-            if value < 36.1:
-                return "low"
-            elif 36.1 <= value <= 37.2:
-                return "normal"
-            elif 37.3 <= value <= 38.0:
-                return "mild_fever"
-            else:
-                return "high_fever"
-        except (ValueError, IndexError):
+        match = _LEADING_FLOAT.match(temp.replace('°C', ''))
+        if not match:
             return "invalid"
+        value = float(match.group(1))
+        
+        if value < 36.1:
+            return "low"
+        elif 36.1 <= value <= 37.2:
+            return "normal"
+        elif 37.3 <= value <= 38.0:
+            return "mild_fever"
+        else:
+            return "high_fever"
     
     def _classify_bmi(self, bmi: Optional[str]) -> str:
         """Classifica il BMI."""
         if not bmi:
             return "unknown"
         
-        try:
-            value = float(bmi)
-            
-            if value < 18.5:
-                return "underweight"
-            elif 18.5 <= value <= 24.9:
-                return "normal"
-            elif 25.0 <= value <= 29.9:
-                return "overweight"
-            else:
-                return "obese"
-        except (ValueError, IndexError):
+        match = _LEADING_FLOAT.match(bmi)
+        if not match:
             return "invalid"
+        value = float(match.group(1))
+        
+        if value < 18.5:
+            return "underweight"
+        elif 18.5 <= value <= 24.9:
+            return "normal"
+        elif 25.0 <= value <= 29.9:
+            return "overweight"
+        else:
+            return "obese"
     
-    def _assess_risk(self, parameters: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    def _assess_risk(
+        self,
+        parameters: Dict[str, Optional[str]],
+        statuses: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
         """
         Valuta il rischio generale basato sui parametri vitali.
         
         Args:
             parameters (Dict): Parametri vitali estratti
+            statuses (Dict, optional): Classificazioni già calcolate da
+                _classify_all; se assenti vengono ricalcolate
             
         Returns:
             Dict: Valutazione del rischio
@@ -273,28 +349,31 @@ class JSONOutputGenerator:
         risk_factors = []
         risk_level = "unknown"
         
+        if statuses is None:
+            statuses = self._classify_all(parameters)
+        
         # Controlla ogni parametro
-        bp_status = self._classify_blood_pressure(parameters.get('blood_pressure'))
+        bp_status = statuses['blood_pressure']
         if bp_status in ['high_stage1', 'high_stage2']:
             risk_factors.append("Ipertensione")
         
-        hr_status = self._classify_heart_rate(parameters.get('heart_rate'))
+        hr_status = statuses['heart_rate']
         if hr_status in ['low', 'high']:
             risk_factors.append("Frequenza cardiaca anomala")
         
-        glucose_status = self._classify_glucose(parameters.get('glucose'))
+        glucose_status = statuses['glucose']
         if glucose_status in ['prediabetes', 'diabetes']:
             risk_factors.append("Glicemia elevata")
         
-        sat_status = self._classify_saturation(parameters.get('saturation'))
+        sat_status = statuses['saturation']
         if sat_status in ['low', 'critical']:
             risk_factors.append("Saturazione ossigeno bassa")
         
-        temp_status = self._classify_temperature(parameters.get('temperature'))
+        temp_status = statuses['temperature']
         if temp_status in ['mild_fever', 'high_fever']:
             risk_factors.append("Febbre")
         
-        bmi_status = self._classify_bmi(parameters.get('bmi'))
+        bmi_status = statuses['bmi']
         if bmi_status in ['underweight', 'obese']:
             risk_factors.append("BMI anomalo")
         
@@ -316,30 +395,15 @@ class JSONOutputGenerator:
     
     def _get_recommendations(self, risk_factors: list) -> list:
         """Genera raccomandazioni basate sui fattori di rischio."""
-        recommendations = []
-        
-        if "Ipertensione" in risk_factors:
-            recommendations.append("Consultare un medico per la pressione alta")
-            recommendations.append("Ridurre il consumo di sale")
-        
-        if "Glicemia elevata" in risk_factors:
-            recommendations.append("Controllo diabetologico")
-            recommendations.append("Monitoraggio glicemia regolare")
-        
-        if "Saturazione ossigeno bassa" in risk_factors:
-            recommendations.append("Consulenza medica urgente")
-        
-        if "Febbre" in risk_factors:
-            recommendations.append("Monitoraggio temperatura")
-            recommendations.append("Idratazione adeguata")
-        
-        if "BMI anomalo" in risk_factors:
-            recommendations.append("Consulenza nutrizionale")
-        
-        if not recommendations:
-            recommendations.append("Continuare controlli regolari")
+        factors = set(risk_factors)
+        recommendations = [
+            recommendation
+            for factor, factor_recommendations in _FACTOR_RECOMMENDATIONS.items()
+            if factor in factors
+            for recommendation in factor_recommendations
+        ]
         
-        return recommendations
+        return recommendations or ["Continuare controlli regolari"]
     
     def save_to_file(self, data: Dict[str, Any], output_path: str) -> bool:
         """
@@ -353,8 +417,8 @@ class JSONOutputGenerator:
             bool: True se salvato con successo
         """
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with open(output_path, 'wb') as f:
+                f.write(dumps_json(data))
             return True
         except Exception as e:
             print(f"Errore salvando JSON: {str(e)}")
@@ -9,16 +9,17 @@ Author: AI Assistant
 Version: 1.0
 """
 
-import json
 import os
 import sys
-from typing import Dict, Optional, List
+import tempfile
+from typing import Dict, Optional, List, Iterator
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 from ocr_processor import OCRProcessor
-from parameter_extractor import ParameterExtractor
-from json_output import JSONOutputGenerator
+from parameter_extractor import get_extractor
+from json_output import JSONOutputGenerator, dumps_json
 
 
 class MedicalReportProcessor:
@@ -26,17 +27,30 @@ class MedicalReportProcessor:
     Classe principale per processare referti medici e estrarre parametri vitali.
     """
     
-    def __init__(self):
-        self.ocr_processor = OCRProcessor()
-        self.parameter_extractor = ParameterExtractor()
+    def __init__(self, ocr_workers: Optional[int] = None):
+        """
+        Inizializza il processore.
+        
+        Args:
+            ocr_workers (int, optional): Processi massimi per l'OCR delle
+                pagine di un PDF (default: numero di CPU)
+        """
+        self.ocr_processor = OCRProcessor(max_workers=ocr_workers)
+        self.parameter_extractor = get_extractor()
         self.json_generator = JSONOutputGenerator()
     
-    def process_file(self, file_path: str) -> Dict:
+    def process_file(
+        self,
+        file_path: str,
+        stat_result: Optional[os.stat_result] = None
+    ) -> Dict:
         """
         Processa un singolo file (PDF o immagine) ed estrae i parametri vitali.
         
         Args:
             file_path (str): Percorso al file da processare
+            stat_result (os.stat_result, optional): Stat del file già nota
+                (es. da os.scandir), evita di rileggerla dal disco
             
         Returns:
             Dict: Dizionario con i parametri estratti
@@ -44,16 +58,19 @@ class MedicalReportProcessor:
         print(f"📄 Processando file: {file_path}")
         
         # Verifica esistenza file
-        if not os.path.exists(file_path):
+        if stat_result is None and not os.path.exists(file_path):
             raise FileNotFoundError(f"File non trovato: {file_path}")
         
+        # Estensione calcolata una sola volta per OCR e metadati
+        file_ext = os.path.splitext(file_path)[1].lower()
+        
         # Step 1: OCR
         print("🔍 Eseguendo OCR...")
-        raw_text = self.ocr_processor.extract_text(file_path)
+        raw_text = self.ocr_processor.extract_text(file_path, file_ext)
         
         if not raw_text.strip():
             print("⚠️  Warning: Nessun testo estratto dal file")
-            return self._empty_result(file_path)
+            return self._empty_result(file_path, stat_result, file_ext)
         
         # Step 2: Pulizia testo
         print("🧹 Pulendo il testo...")
@@ -68,7 +85,9 @@ class MedicalReportProcessor:
             file_path=file_path,
             raw_text=raw_text,
             cleaned_text=cleaned_text,
-            parameters=parameters
+            parameters=parameters,
+            stat_result=stat_result,
+            file_ext=file_ext
         )
         
         print("✅ Processamento completato!")
@@ -84,39 +103,77 @@ class MedicalReportProcessor:
         Returns:
             List[Dict]: Lista dei risultati per ogni file
         """
-        results = []
-        supported_extensions = {'.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.bmp'}
+        return list(self.iter_process_directory(directory_path))
+    
+    def iter_process_directory(self, directory_path: str) -> Iterator[Dict]:
+        """
+        Processa i file compatibili in una directory restituendo i risultati
+        uno alla volta, senza tenerli tutti in memoria.
+        
+        Args:
+            directory_path (str): Percorso alla directory
+            
+        Yields:
+            Dict: Risultato per ogni file
+        """
+        supported_extensions = self.ocr_processor.supported_extensions
         
         if not os.path.exists(directory_path):
             raise FileNotFoundError(f"Directory non trovata: {directory_path}")
         
-        files = [f for f in os.listdir(directory_path) 
-                if os.path.splitext(f)[1].lower() in supported_extensions]
+        # scandir restituisce anche la stat dei file, riusata nei metadati
+        with os.scandir(directory_path) as it:
+            files = [entry for entry in it
+                     if entry.is_file()
+                     and os.path.splitext(entry.name)[1].lower() in supported_extensions]
         
         if not files:
             print("⚠️  Nessun file compatibile trovato nella directory")
-            return results
+            return
         
         print(f"📂 Trovati {len(files)} file da processare")
         
-        for filename in files:
-            file_path = os.path.join(directory_path, filename)
-            try:
-                result = self.process_file(file_path)
-                results.append(result)
-            except Exception as e:
-                print(f"❌ Errore processando {filename}: {str(e)}")
-                results.append(self._error_result(file_path, str(e)))
+        # I file sono indipendenti: vengono processati in parallelo,
+        # l'ordine dei risultati è preservato da map
+        paths = [entry.path for entry in files]
+        stats = [entry.stat() for entry in files]
+        cpu_count = os.cpu_count() or 1
+        workers = min(cpu_count, len(paths))
+        if workers == 1:
+            # Un solo file o un solo core: nessun pool di file, i file vengono
+            # processati qui e le pagine usano tutti i core
+            for file_path, stat_result in zip(paths, stats):
+                yield self._process_file_safe(file_path, stat_result)
+            return
         
-        return results
+        # I core vengono divisi tra i file e, se avanzano, tra le pagine dei PDF
+        ocr_workers = max(1, cpu_count // len(paths))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(ocr_workers,)) as executor:
+            yield from executor.map(_process_one, paths, stats)
+    
+    def _process_file_safe(self, file_path: str, stat_result: os.stat_result) -> Dict:
+        """Processa un file convertendo gli errori in un risultato di errore."""
+        try:
+            return self.process_file(file_path, stat_result)
+        except Exception as e:
+            print(f"❌ Errore processando {os.path.basename(file_path)}: {str(e)}")
+            return self._error_result(file_path, str(e))
     
-    def _empty_result(self, file_path: str) -> Dict:
+    def _empty_result(
+        self,
+        file_path: str,
+        stat_result: Optional[os.stat_result] = None,
+        file_ext: Optional[str] = None
+    ) -> Dict:
         """Genera un risultato vuoto per file senza testo."""
         return self.json_generator.generate_output(
             file_path=file_path,
             raw_text="",
             cleaned_text="",
-            parameters={}
+            parameters={},
+            stat_result=stat_result,
+            file_ext=file_ext
         )
     
     def _error_result(self, file_path: str, error_message: str) -> Dict:
@@ -130,6 +187,21 @@ class MedicalReportProcessor:
         }
 
 
+# Processore usato da ciascun worker di iter_process_directory
+_worker_processor: Optional[MedicalReportProcessor] = None
+
+
+def _init_worker(ocr_workers: int):
+    """Crea il processore una sola volta per ogni worker."""
+    global _worker_processor
+    _worker_processor = MedicalReportProcessor(ocr_workers=ocr_workers)
+
+
+def _process_one(file_path: str, stat_result: os.stat_result) -> Dict:
+    """Processa un file nel worker, convertendo gli errori in un risultato di errore."""
+    return _worker_processor._process_file_safe(file_path, stat_result)
+
+
 def main():
     """Funzione principale del programma."""
     parser = argparse.ArgumentParser(
@@ -157,34 +229,62 @@ def main():
         
         # Processa file singolo o directory
         if os.path.isfile(args.input_path):
-            results = [processor.process_file(args.input_path)]
+            results = iter([processor.process_file(args.input_path)])
         elif os.path.isdir(args.input_path):
-            results = processor.process_directory(args.input_path)
+            results = processor.iter_process_directory(args.input_path)
         else:
             print(f"❌ Errore: {args.input_path} non è un file o directory valido")
             sys.exit(1)
         
-        # Salva risultati
-        with open(args.output, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        # Salva i risultati man mano che vengono prodotti (array JSON incrementale),
+        # tenendo in memoria solo un riepilogo per le statistiche. L'array viene
+        # scritto in un file temporaneo nella stessa directory e sostituito
+        # all'output solo a elaborazione completata: un'interruzione non lascia
+        # JSON troncato né sovrascrive l'output precedente.
+        summaries = []
+        output_dir = os.path.dirname(os.path.abspath(args.output))
+        tmp_file = tempfile.NamedTemporaryFile(dir=output_dir, suffix='.tmp', delete=False)
+        try:
+            with tmp_file as f:
+                f.write(b'[')
+                for i, result in enumerate(results):
+                    f.write(b',\n' if i else b'\n')
+                    f.write(dumps_json(result))
+                    
+                    params = result.get('parameters', {})
+                    summaries.append({
+                        'file_path': result.get('file_path', 'Unknown'),
+                        'status': result.get('status'),
+                        'error': result.get('error'),
+                        'found_params': sum(v is not None for v in params.values())
+                    })
+                f.write(b'\n]' if summaries else b']')
+            # NamedTemporaryFile crea il file con permessi 0600: ripristina
+            # quelli che avrebbe avuto un normale open()
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_file.name, 0o666 & ~umask)
+            os.replace(tmp_file.name, args.output)
+        except BaseException:
+            if os.path.exists(tmp_file.name):
+                os.remove(tmp_file.name)
+            raise
         
         print(f"💾 Risultati salvati in: {args.output}")
         
         # Statistiche finali
-        total_files = len(results)
-        successful = sum(1 for r in results if r.get('status') != 'error')
+        total_files = len(summaries)
+        successful = sum(r['status'] != 'error' for r in summaries)
         print(f"📊 Processati: {successful}/{total_files} file con successo")
         
         # Output verboso
         if args.verbose:
-            for result in results:
-                print(f"\n📄 {result.get('file_path', 'Unknown')}")
-                if result.get('status') == 'error':
-                    print(f"❌ Errore: {result.get('error')}")
+            for summary in summaries:
+                print(f"\n📄 {summary['file_path']}")
+                if summary['status'] == 'error':
+                    print(f"❌ Errore: {summary['error']}")
                 else:
-                    params = result.get('parameters', {})
-                    found_params = sum(1 for v in params.values() if v is not None)
-                    print(f"✅ Parametri estratti: {found_params}/8")
+                    print(f"✅ Parametri estratti: {summary['found_params']}/8")
     
     except KeyboardInterrupt:
         print("\n⏹️  Operazione interrotta dall'utente")
@@ -7,32 +7,178 @@ Modulo per l'estrazione e pulizia del testo da PDF e immagini.
 
 import re
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import repeat
 from typing import Optional
 from PIL import Image
+import cv2
+import numpy as np
 import pytesseract
 import pdf2image
 
 
+# Versione di Tesseract, verificata una sola volta per processo
+_TESSERACT_VERSION = None
+_TESSERACT_LOCK = threading.Lock()
+
+# Pattern precompilati per la pulizia del testo OCR
+_NON_PRINTABLE = re.compile(r'[^\w\s\.,;:()\-+/=%°<>àèìòùáéíóúâêîôûäëïöüç]')
+# Stessa pulizia come tabella per str.translate, valida per testo solo ASCII
+_NON_PRINTABLE_ASCII = str.maketrans(
+    {c: ' ' for c in range(128) if _NON_PRINTABLE.match(chr(c))}
+)
+_WHITESPACE = re.compile(r'\s+')
+_DECIMAL = re.compile(r'(\d)\s*[,\.]\s*(\d)')
+_FRACTION = re.compile(r'(\d)\s*/\s*(\d)')
+_SPACE_BEFORE_PUNCT = re.compile(r'\s+([,.;:])')
+_MISSING_SPACE_AFTER_PUNCT = re.compile(r'([,.;:])([a-zA-Z])')
+_DIGITS = frozenset('0123456789')
+
+# Standardizza unità di misura comuni
+_UNIT_REPLACEMENTS = {
+    'mmhg': 'mmHg',
+    'bpm': 'bpm',
+    'mg/dl': 'mg/dL',
+    'mg dl': 'mg/dL',
+    'spo2': 'SpO2',
+    '°c': '°C',
+    ' c°': '°C',
+    'gradi': '°C',
+}
+
+# Standardizza termini medici comuni
+_MEDICAL_TERMS = {
+    'pressione arteriosa': 'pressione',
+    'press art': 'pressione',
+    'pa': 'pressione',
+    'frequenza cardiaca': 'frequenza',
+    'freq cardiaca': 'frequenza',
+    'fc': 'frequenza',
+    'battiti': 'bpm',
+    'saturazione ossigeno': 'saturazione',
+    'sat o2': 'saturazione',
+    'ossigenazione': 'saturazione',
+    'glicemia': 'glicemia',
+    'glucosio': 'glicemia',
+    'temperatura corporea': 'temperatura',
+    'temp': 'temperatura',
+    'febbre': 'temperatura',
+}
+
+# Unica alternanza per tutte le sostituzioni (le chiavi più lunghe per prime,
+# così 'pressione arteriosa' ha precedenza su 'pa'). I termini medici devono
+# essere parole intere: non preceduti né seguiti da una lettera, così 'temp'
+# non modifica 'temperatura' e 'pa' non modifica 'paziente' (le cifre restano
+# ammesse, es. 'fc76'). Le unità possono invece seguire il numero ('80mmhg').
+_PREPROCESS_TABLE = {**_UNIT_REPLACEMENTS, **_MEDICAL_TERMS}
+_PREPROCESS_RE = re.compile(
+    r'(?<![^\W\d_])(?:'
+    + '|'.join(re.escape(k) for k in sorted(_MEDICAL_TERMS, key=len, reverse=True))
+    + r')(?![^\W\d_])|'
+    + '|'.join(re.escape(k) for k in sorted(_UNIT_REPLACEMENTS, key=len, reverse=True))
+)
+
+
+def _binarize(image: Image.Image) -> Image.Image:
+    """
+    Converte un'immagine RGB in bianco e nero con soglia di Otsu.
+    
+    Tesseract lavora più velocemente su immagini già binarizzate,
+    soprattutto con scansioni rumorose.
+    
+    Args:
+        image (Image.Image): Immagine RGB
+        
+    Returns:
+        Image.Image: Immagine binarizzata (modo 'L')
+    """
+    gray = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2GRAY)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return Image.fromarray(binary)
+
+
+def _ocr_page(pdf_path: str, page_number: int, lang: str, config: str) -> str:
+    """
+    Converte ed esegue l'OCR su una singola pagina di un PDF.
+    
+    Definita a livello di modulo per poter essere eseguita nei worker
+    del process pool. Ogni worker converte solo la propria pagina, così
+    in memoria c'è al massimo un'immagine a 300 DPI per worker e la
+    conversione si sovrappone all'OCR delle altre pagine.
+    
+    Args:
+        pdf_path (str): Percorso al PDF
+        page_number (int): Numero di pagina (da 1)
+        lang (str): Lingue Tesseract
+        config (str): Configurazione per Tesseract
+        
+    Returns:
+        str: Testo estratto dalla pagina
+    """
+    page = pdf2image.convert_from_path(
+        pdf_path,
+        dpi=300,
+        first_page=page_number,
+        last_page=page_number
+    )[0]
+    try:
+        return pytesseract.image_to_string(_binarize(page), lang=lang, config=config)
+    finally:
+        page.close()
+
+
 class OCRProcessor:
     """
     Classe per gestire l'estrazione OCR da diversi tipi di file.
     """
     
-    def __init__(self, tesseract_config: str = "--oem 3 --psm 6"):
+    def __init__(
+        self,
+        tesseract_config: str = "--oem 3 --psm 6",
+        max_workers: Optional[int] = None
+    ):
         """
         Inizializza il processore OCR.
         
         Args:
             tesseract_config (str): Configurazione per Tesseract
+            max_workers (int, optional): Processi massimi per l'OCR delle
+                pagine di un PDF (default: numero di CPU)
         """
         self.tesseract_config = tesseract_config
+        self.max_workers = max_workers
+        
+        # Gestore di estrazione per ogni estensione supportata
+        self._ext_handlers = {
+            '.pdf': self._extract_from_pdf,
+            '.png': self._extract_from_image,
+            '.jpg': self._extract_from_image,
+            '.jpeg': self._extract_from_image,
+            '.tiff': self._extract_from_image,
+            '.bmp': self._extract_from_image,
+        }
+        self.supported_extensions = frozenset(self._ext_handlers)
         self._check_dependencies()
     
     def _check_dependencies(self):
-        """Verifica che le dipendenze OCR siano disponibili."""
+        """
+        Verifica che le dipendenze OCR siano disponibili.
+        
+        Il controllo avvia un sottoprocesso, quindi viene eseguito una sola
+        volta per processo e il risultato è condiviso tra le istanze.
+        """
+        global _TESSERACT_VERSION
+        
+        if _TESSERACT_VERSION is not None:
+            return
+        
         try:
-            # Test Tesseract
-            pytesseract.get_tesseract_version()
+            with _TESSERACT_LOCK:
+                if _TESSERACT_VERSION is None:
+                    # Test Tesseract
+                    _TESSERACT_VERSION = pytesseract.get_tesseract_version()
         except Exception as e:
             raise RuntimeError(
                 "Tesseract non trovato. Installa con: "
@@ -40,24 +186,26 @@ class OCRProcessor:
                 "brew install tesseract (macOS)"
             )
     
-    def extract_text(self, file_path: str) -> str:
+    def extract_text(self, file_path: str, file_ext: Optional[str] = None) -> str:
         """
         Estrae testo da un file PDF o immagine.
         
         Args:
             file_path (str): Percorso al file
+            file_ext (str, optional): Estensione in minuscolo già calcolata
+                dal chiamante (es. '.pdf')
             
         Returns:
             str: Testo estratto
         """
-        file_ext = os.path.splitext(file_path)[1].lower()
+        if file_ext is None:
+            file_ext = os.path.splitext(file_path)[1].lower()
         
-        if file_ext == '.pdf':
-            return self._extract_from_pdf(file_path)
-        elif file_ext in ['.png', '.jpg', '.jpeg', '.tiff', '.bmp']:
-            return self._extract_from_image(file_path)
-        else:
+        handler = self._ext_handlers.get(file_ext)
+        if handler is None:
             raise ValueError(f"Formato file non supportato: {file_ext}")
+        
+        return handler(file_path)
     
     def _extract_from_pdf(self, pdf_path: str) -> str:
         """
@@ -70,22 +218,31 @@ class OCRProcessor:
             str: Testo estratto da tutte le pagine
         """
         try:
-            # Converti PDF in immagini
-            pages = pdf2image.convert_from_path(pdf_path, dpi=300)
+            # Le pagine vengono convertite una alla volta nei worker
+            page_count = pdf2image.pdfinfo_from_path(pdf_path)["Pages"]
+            
+            if not page_count:
+                return ""
             
+            # OCR parallelo sulle pagine, l'ordine è preservato da map
+            # (con un solo worker si evita di avviare il process pool)
             extracted_text = []
-            for i, page in enumerate(pages):
-                print(f"  📄 Processando pagina {i+1}/{len(pages)}")
-                
-                # OCR su ogni pagina
-                page_text = pytesseract.image_to_string(
-                    page, 
-                    lang='ita+eng',  # Supporto italiano e inglese
-                    config=self.tesseract_config
+            workers = min(self.max_workers or os.cpu_count() or 1, page_count)
+            pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext()
+            with pool as executor:
+                page_texts = (executor.map if executor else map)(
+                    _ocr_page,
+                    repeat(pdf_path),
+                    range(1, page_count + 1),
+                    repeat('ita+eng'),  # Supporto italiano e inglese
+                    repeat(self.tesseract_config)
                 )
                 
-                if page_text.strip():
-                    extracted_text.append(page_text)
+                for i, page_text in enumerate(page_texts):
+                    print(f"  📄 Processata pagina {i+1}/{page_count}")
+                    
+                    if page_text.strip():
+                        extracted_text.append(page_text)
             
             return '\n\n'.join(extracted_text)
             
@@ -110,6 +267,9 @@ class OCRProcessor:
             if image.mode != 'RGB':
                 image = image.convert('RGB')
             
+            # Binarizza prima dell'OCR
+            image = _binarize(image)
+            
             # OCR
             text = pytesseract.image_to_string(
                 image,
@@ -138,32 +298,33 @@ class OCRProcessor:
         text = raw_text
         
         # Rimuovi caratteri strani e simboli non ASCII comuni dell'OCR
-        text = re.sub(r'[^\w\s\.,;:()\-+/=%°<>àèìòùáéíóúâêîôûäëïöüç]', ' ', text)
+        # (translate è molto più veloce, ma la tabella copre solo l'ASCII)
+        if text.isascii():
+            text = text.translate(_NON_PRINTABLE_ASCII)
+        else:
+            text = _NON_PRINTABLE.sub(' ', text)
         
         # Sistema spazi multipli
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE.sub(' ', text)
         
         # Rimuovi righe molto corte (probabilmente artefatti)
-        lines = text.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            # Mantieni linee con almeno 3 caratteri o che contengono numeri
-            if len(line) >= 3 or re.search(r'\d', line):
-                cleaned_lines.append(line)
+        # Mantieni linee con almeno 3 caratteri o che contengono numeri
+        cleaned_lines = [
+            line for line in (raw_line.strip() for raw_line in text.split('\n'))
+            if len(line) >= 3 or not _DIGITS.isdisjoint(line)
+        ]
         
         text = '\n'.join(cleaned_lines)
         
         # Normalizza punteggiatura comune
-        text = re.sub(r'(\d)\s*[,\.]\s*(\d)', r'\1.\2', text)  # Numeri decimali
-        text = re.sub(r'(\d)\s*/\s*(\d)', r'\1/\2', text)      # Frazioni come pressione
+        text = _DECIMAL.sub(r'\1.\2', text)  # Numeri decimali
+        text = _FRACTION.sub(r'\1/\2', text)  # Frazioni come pressione
         
         # Rimuovi spazi prima della punteggiatura
-        text = re.sub(r'\s+([,.;:])', r'\1', text)
+        text = _SPACE_BEFORE_PUNCT.sub(r'\1', text)
         
         # Aggiungi spazio dopo punteggiatura se mancante
-        text = re.sub(r'([,.;:])([a-zA-Z])', r'\1 \2', text)
+        text = _MISSING_SPACE_AFTER_PUNCT.sub(r'\1 \2', text)
         
         return text.strip()
     
@@ -177,44 +338,5 @@ class OCRProcessor:
         Returns:
             str: Testo preprocessato
         """
-        # Converti tutto in minuscolo per le regex
-        text = text.lower()
-        
-        # Standardizza unità di misura comuni
-        replacements = {
-            'mmhg': 'mmHg',
-            'bpm': 'bpm',
-            'mg/dl': 'mg/dL',
-            'mg dl': 'mg/dL',
-            'spo2': 'SpO2',
-            '°c': '°C',
-            ' c°': '°C',
-            'gradi': '°C',
-        }
-        
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        
-        # Standardizza termini medici comuni
-        medical_terms = {
-            'pressione arteriosa': 'pressione',
-            'press art': 'pressione',
-            'pa': 'pressione',
-            'frequenza cardiaca': 'frequenza',
-            'freq cardiaca': 'frequenza',
-            'fc': 'frequenza',
-            'battiti': 'bpm',
-            'saturazione ossigeno': 'saturazione',
-            'sat o2': 'saturazione',
-            'ossigenazione': 'saturazione',
-            'glicemia': 'glicemia',
-            'glucosio': 'glicemia',
-            'temperatura corporea': 'temperatura',
-            'temp': 'temperatura',
-            'febbre': 'temperatura',
-        }
-        
-        for old, new in medical_terms.items():
-            text = text.replace(old, new)
-        
-        return text
\ No newline at end of file
+        # Converti tutto in minuscolo e standardizza unità e termini in un solo passaggio
+        return _PREPROCESS_RE.sub(lambda m: _PREPROCESS_TABLE[m.group(0)], text.lower())
@@ -6,7 +6,246 @@ Modulo per l'estrazione di parametri vitali tramite regex.
 """
 
 import re
-from typing import Dict, Optional, List, Tuple
+from string import ascii_letters
+from itertools import groupby
+from os.path import commonprefix
+from typing import Dict, Iterator, Optional, List, Tuple
+
+
+# Gruppi di sinonimi nei pattern, es. (?:pressione|pa|press)
+_WORD_ALTERNATION = re.compile(r'\(\?:([a-z0-9]+(?:\|[a-z0-9]+)+)\)')
+
+# Chiavi restituite da extract_all_parameters
+_PARAMETER_NAMES = (
+    'blood_pressure', 'heart_rate', 'glucose', 'saturation',
+    'temperature', 'weight', 'height', 'bmi'
+)
+
+# Tutti i pattern richiedono almeno una cifra
+_ANY_DIGIT = re.compile(r'\d', re.ASCII)
+
+
+def _regex_opt_inner(strings: List[str], open_paren: str) -> str:
+    """Costruisce ricorsivamente la regex a prefissi comuni (vedi _regex_opt)."""
+    close_paren = ')' if open_paren else ''
+    if not strings:
+        return ''
+    first = strings[0]
+    if len(strings) == 1:
+        return open_paren + re.escape(first) + close_paren
+    if not first:
+        # Una parola è prefisso delle altre: il resto diventa opzionale
+        return open_paren + _regex_opt_inner(strings[1:], '(?:') + '?' + close_paren
+    
+    # Prefisso comune a tutte le parole
+    prefix = commonprefix(strings)
+    if prefix:
+        return (open_paren + re.escape(prefix)
+                + _regex_opt_inner([s[len(prefix):] for s in strings], '(?:')
+                + close_paren)
+    
+    # Suffisso comune a tutte le parole
+    suffix = commonprefix([s[::-1] for s in strings])[::-1]
+    if suffix:
+        return (open_paren
+                + _regex_opt_inner(sorted(s[:-len(suffix)] for s in strings), '(?:')
+                + re.escape(suffix) + close_paren)
+    
+    # Raggruppa per iniziale e ottimizza ogni gruppo separatamente
+    return open_paren + '|'.join(
+        _regex_opt_inner(list(group), '')
+        for _, group in groupby(strings, lambda s: s[0])
+    ) + close_paren
+
+
+def _regex_opt(words: List[str]) -> str:
+    """
+    Converte una lista di parole in un'alternanza a prefissi comuni (trie),
+    come regexopt di Pygments.
+    
+    Es. ['pressione', 'pa', 'press'] -> (?:p(?:a|ress(?:(?:ione)?)))
+    
+    Args:
+        words (List[str]): Parole alternative
+        
+    Returns:
+        str: Gruppo regex non catturante equivalente
+    """
+    return _regex_opt_inner(sorted(set(words)), '(?:')
+
+
+def _same_length_range(lo: str, hi: str) -> List[str]:
+    """Alternative regex per gli interi tra lo e hi (stesso numero di cifre)."""
+    if not lo:
+        return ['']
+    if lo[0] == hi[0]:
+        return [lo[0] + part for part in _same_length_range(lo[1:], hi[1:])]
+    
+    rest = len(lo) - 1
+    head, first, last, tail = [], int(lo[0]), int(hi[0]), []
+    if lo[1:] != '0' * rest:
+        head = [lo[0] + part for part in _same_length_range(lo[1:], '9' * rest)]
+        first += 1
+    if hi[1:] != '9' * rest:
+        tail = [hi[0] + part for part in _same_length_range('0' * rest, hi[1:])]
+        last -= 1
+    if first > last:
+        return head + tail
+    digit = str(first) if first == last else f'[{first}-{last}]'
+    return head + [digit + r'\d' * rest] + tail
+
+
+def _range_regex(lo: int, hi: int) -> str:
+    """
+    Costruisce un gruppo regex (non catturante) per gli interi tra lo e hi,
+    così i valori fuori range vengono scartati dal motore regex stesso.
+    
+    Es. _range_regex(70, 250) -> (?:1\\d\\d|2[0-4]\\d|250|[7-9]\\d)
+    
+    Args:
+        lo (int): Valore minimo (incluso)
+        hi (int): Valore massimo (incluso)
+        
+    Returns:
+        str: Gruppo regex, con le alternative più lunghe per prime
+    """
+    parts = []
+    for length in range(len(str(hi)), len(str(lo)) - 1, -1):
+        start = lo if length == len(str(lo)) else 10 ** (length - 1)
+        end = min(hi, 10 ** length - 1)
+        parts.extend(_same_length_range(str(start), str(end)))
+    return '(?:' + '|'.join(parts) + ')'
+
+
+def _int_group(lo: int, hi: int) -> str:
+    """Gruppo catturante per un intero tra lo e hi, non seguito da altre cifre."""
+    return f'({_range_regex(lo, hi)})(?!\\d)'
+
+
+def _compile_patterns(
+    patterns: List[Tuple[str, Tuple[str, ...]]]
+) -> Tuple[Tuple[re.Pattern, Tuple[str, ...]], ...]:
+    """
+    Compila una lista di pattern regex (in minuscolo), riscrivendo i
+    gruppi di sinonimi come alternanze a prefissi comuni.
+    
+    Con re.ASCII le classi \\d e \\s usano semplici confronti ASCII invece
+    delle tabelle Unicode (le cifre dei referti sono comunque ASCII).
+    
+    Args:
+        patterns (List[Tuple]): Coppie (pattern, parole letterali); almeno una
+            delle parole deve comparire nel testo perché il pattern possa
+            corrispondere. Una tupla vuota disattiva il filtro.
+        
+    Returns:
+        Tuple[Tuple]: Coppie (pattern compilato, parole letterali), nello
+            stesso ordine
+    """
+    return tuple(
+        (
+            re.compile(
+                _WORD_ALTERNATION.sub(lambda m: _regex_opt(m.group(1).split('|')), pattern),
+                re.ASCII
+            ),
+            anchors
+        )
+        for pattern, anchors in patterns
+    )
+
+
+# Pattern per i parametri vitali, compilati una sola volta all'import del
+# modulo e condivisi (in sola lettura) da tutte le istanze dell'estrattore.
+# Ogni pattern dichiara le parole letterali (etichetta o unità) di cui almeno
+# una è necessaria perché corrisponda, usate come filtro prima della ricerca.
+
+# Valori interi realistici, validati direttamente dalla regex
+_SYSTOLIC, _DIASTOLIC = _int_group(70, 250), _int_group(40, 150)
+_HEART_RATE = _int_group(40, 200)
+_GLUCOSE = _int_group(50, 500)
+_SATURATION = _int_group(70, 100)
+
+# Pattern per pressione arteriosa (120/80 mmHg)
+_BLOOD_PRESSURE_PATTERNS = _compile_patterns([
+    (rf'(?:pressione|pa|press)[:\s]*{_SYSTOLIC}\s*/\s*{_DIASTOLIC}\s*mmhg', ('pa', 'press')),
+    (rf'(?<![\d/]){_SYSTOLIC}\s*/\s*{_DIASTOLIC}\s*mmhg', ('mmhg',)),
+    (rf'(?:pressione|pa)[:\s]*{_SYSTOLIC}\s*/\s*{_DIASTOLIC}', ('pressione', 'pa')),
+    # Distanza limitata tra i due valori: con .*? ogni 'sist' senza
+    # 'diast' a seguire costringeva a scandire tutto il testo
+    (rf'(?:sistolica|sist)[:\s]*{_SYSTOLIC}.{{0,80}}?(?:diastolica|diast)[:\s]*{_DIASTOLIC}', ('sist',)),
+])
+
+# Pattern per frequenza cardiaca (bpm)
+_HEART_RATE_PATTERNS = _compile_patterns([
+    (rf'(?:frequenza|fc|freq)[:\s]*{_HEART_RATE}\s*bpm', ('fc', 'freq')),
+    (rf'(?<![\d/]){_HEART_RATE}\s*bpm', ('bpm',)),
+    (rf'(?:frequenza|fc|battiti)[:\s]*{_HEART_RATE}', ('frequenza', 'fc', 'battiti')),
+    (rf'(?:polso|pulse)[:\s]*{_HEART_RATE}', ('polso', 'pulse')),
+])
+
+# Pattern per glicemia (mg/dL)
+_GLUCOSE_PATTERNS = _compile_patterns([
+    (rf'(?:glicemia|glucosio|gluc)[:\s]*{_GLUCOSE}\s*mg/dl', ('glicemia', 'gluc')),
+    (rf'(?:glicemia|glucosio)[:\s]*{_GLUCOSE}', ('glicemia', 'glucosio')),
+    (rf'glucose?\s*(?::\s*)?{_GLUCOSE}\s*mg/dl', ('glucos',)),
+    (rf'bg\s*(?::\s*)?{_GLUCOSE}', ('bg',)),
+])
+
+# Pattern per saturazione (SpO2 %)
+_SATURATION_PATTERNS = _compile_patterns([
+    (rf'(?:saturazione|sat|spo2)[:\s]*{_SATURATION}\s*%', ('sat', 'spo2')),
+    (rf'spo2[:\s]*{_SATURATION}', ('spo2',)),
+    (rf'(?:saturazione|ossigenazione)[:\s]*{_SATURATION}', ('saturazione', 'ossigenazione')),
+    (rf'o2[:\s]*{_SATURATION}\s*%', ('o2',)),
+])
+
+# Pattern per temperatura (°C): valore in 'val'. L'unità non viene catturata:
+# °C è l'unica ammessa e l'intervallo 35-42 esclude già valori in °F, così come
+# per il peso (solo kg); il gruppo 'unit' serve solo all'altezza (cm o m)
+_TEMPERATURE_PATTERNS = _compile_patterns([
+    (r'(?:temperatura|temp|febbre)[:\s]*(?P<val>\d{2,3}\.?\d?)\s*°c', ('temp', 'febbre')),
+    (r'(?:temperatura|temp)[:\s]*(?P<val>\d{2,3}\.?\d?)', ('temp',)),
+    (r'(?P<val>\d{2,3}\.\d)\s*°c', ('°c',)),
+    (r'(?:febbre|fever)[:\s]*(?P<val>\d{2,3}\.?\d?)', ('febbre', 'fever')),
+])
+
+# Pattern per peso (kg): valore in 'val'
+_WEIGHT_PATTERNS = _compile_patterns([
+    (r'(?:peso|weight|wt)[:\s]*(?P<val>\d{2,3}\.?\d?)\s*kg', ('peso', 'weight', 'wt')),
+    (r'(?:peso|weight)[:\s]*(?P<val>\d{2,3}\.?\d?)', ('peso', 'weight')),
+    (r'(?P<val>\d{2,3}\.?\d?)\s*kg(?:\s|$)', ('kg',)),
+    (r'body\s*weight[:\s]*(?P<val>\d{2,3}\.?\d?)', ('body',)),
+])
+
+# Pattern per altezza (cm): valore in 'val', unità (se presente) in 'unit'
+_HEIGHT_PATTERNS = _compile_patterns([
+    (r'(?:altezza|height|ht)[:\s]*(?P<val>\d{3})\s*(?P<unit>cm)', ('altezza', 'ht')),
+    (r'(?:altezza|height)[:\s]*(?P<val>\d{3})', ('altezza', 'height')),
+    (r'(?P<val>\d{3})\s*(?P<unit>cm)(?:\s|$)', ('cm',)),
+    (r'(?:statura|tall)[:\s]*(?P<val>\d{3})', ('statura', 'tall')),
+    (r'(?P<val>\d\.\d{2})\s*(?P<unit>m)', ('m',)),  # formato metri (es. 1.75 m)
+])
+
+# Tutte le parole letterali usate come filtro dai pattern
+_ALL_ANCHORS = frozenset().union(*(
+    anchors
+    for group in (
+        _BLOOD_PRESSURE_PATTERNS, _HEART_RATE_PATTERNS, _GLUCOSE_PATTERNS,
+        _SATURATION_PATTERNS, _TEMPERATURE_PATTERNS, _WEIGHT_PATTERNS,
+        _HEIGHT_PATTERNS
+    )
+    for _, anchors in group
+))
+
+
+def _anchors_in(lowered: str) -> frozenset:
+    """
+    Parole letterali dei pattern presenti nel testo (già in minuscolo).
+    
+    Calcolato una volta per documento da extract_all_parameters e passato ai
+    sette estrattori, così ogni parola viene cercata una sola volta invece
+    che per ogni pattern.
+    """
+    return frozenset(anchor for anchor in _ALL_ANCHORS if anchor in lowered)
 
 
 class ParameterExtractor:
@@ -16,67 +255,41 @@ class ParameterExtractor:
     
     def __init__(self):
         """Inizializza l'estrattore con i pattern regex."""
-        self._init_regex_patterns()
+        self.blood_pressure_patterns = _BLOOD_PRESSURE_PATTERNS
+        self.heart_rate_patterns = _HEART_RATE_PATTERNS
+        self.glucose_patterns = _GLUCOSE_PATTERNS
+        self.saturation_patterns = _SATURATION_PATTERNS
+        self.temperature_patterns = _TEMPERATURE_PATTERNS
+        self.weight_patterns = _WEIGHT_PATTERNS
+        self.height_patterns = _HEIGHT_PATTERNS
     
-    def _init_regex_patterns(self):
-        """Inizializza tutti i pattern regex per i parametri vitali."""
-        
-        # Pattern per pressione arteriosa (120/80 mmHg)
-        self.blood_pressure_patterns = [
-            r'(?:pressione|pa|press)\s*[:\s]*(\d{2,3})\s*/\s*(\d{2,3})\s*mmhg',
-            r'(\d{2,3})\s*/\s*(\d{2,3})\s*mmhg',
-            r'(?:pressione|pa)\s*[:\s]*(\d{2,3})\s*/\s*(\d{2,3})',
-            r'(?:sistolica|sist)\s*[:\s]*(\d{2,3}).*?(?:diastolica|diast)\s*[:\s]*(\d{2,3})',
-        ]
-        
-        # Pattern per frequenza cardiaca (bpm)
-        self.heart_rate_patterns = [
-            r'(?:frequenza|fc|freq)\s*[:\s]*(\d{2,3})\s*bpm',
-            r'(\d{2,3})\s*bpm',
-            r'(?:frequenza|fc|battiti)\s*[:\s]*(\d{2,3})',
-            r'(?:polso|pulse)\s*[:\s]*(\d{2,3})',
-        ]
-        
-        # Pattern per glicemia (mg/dL)
-        self.glucose_patterns = [
-            r'(?:glicemia|glucosio|gluc)\s*[:\s]*(\d{2,3})\s*mg/dl',
-            r'(?:glicemia|glucosio)\s*[:\s]*(\d{2,3})',
-            r'glucose?\s*:?\s*(\d{2,3})\s*mg/dl',
-            r'bg\s*:?\s*(\d{2,3})',
-        ]
-        
-        # Pattern per saturazione (SpO2 %)
-        self.saturation_patterns = [
-            r'(?:saturazione|sat|spo2)\s*[:\s]*(\d{2,3})\s*%',
-            r'spo2\s*[:\s]*(\d{2,3})',
-            r'(?:saturazione|ossigenazione)\s*[:\s]*(\d{2,3})',
-            r'o2\s*[:\s]*(\d{2,3})\s*%',
-        ]
-        
-        # Pattern per temperatura (°C)
-        self.temperature_patterns = [
-            r'(?:temperatura|temp|febbre)\s*[:\s]*(\d{2,3}\.?\d?)\s*°c',
-            r'(?:temperatura|temp)\s*[:\s]*(\d{2,3}\.?\d?)',
-            r'(\d{2,3}\.\d)\s*°c',
-            r'(?:febbre|fever)\s*[:\s]*(\d{2,3}\.?\d?)',
-        ]
-        
-        # Pattern per peso (kg)
-        self.weight_patterns = [
-            r'(?:peso|weight|wt)\s*[:\s]*(\d{2,3}\.?\d?)\s*kg',
-            r'(?:peso|weight)\s*[:\s]*(\d{2,3}\.?\d?)',
-            r'(\d{2,3}\.?\d?)\s*kg(?:\s|$)',
-            r'body\s*weight\s*[:\s]*(\d{2,3}\.?\d?)',
-        ]
+    def _matches(
+        self,
+        patterns: Tuple[Tuple[re.Pattern, Tuple[str, ...]], ...],
+        lowered: str,
+        present: Optional[frozenset] = None
+    ) -> Iterator[re.Match]:
+        """
+        Restituisce, in ordine di priorità, la prima corrispondenza di ogni pattern.
         
-        # Pattern per altezza (cm)
-        self.height_patterns = [
-            r'(?:altezza|height|ht)\s*[:\s]*(\d{3})\s*cm',
-            r'(?:altezza|height)\s*[:\s]*(\d{3})',
-            r'(\d{3})\s*cm(?:\s|$)',
-            r'(?:statura|tall)\s*[:\s]*(\d{3})',
-            r'(\d)\.\d{2}\s*m',  # formato metri (es. 1.75 m)
-        ]
+        Il testo arriva già in minuscolo (lo converte una sola volta il metodo
+        pubblico chiamato), così i pattern sono compilati senza re.IGNORECASE
+        e il motore confronta i caratteri direttamente.
+        I pattern le cui parole letterali (etichetta o unità) non compaiono nel
+        testo vengono saltati con una semplice ricerca di sottostringa, molto
+        più economica di una ricerca regex che fallisce. Se il chiamante ha già
+        calcolato le parole presenti (present, vedi _anchors_in) si usa quello.
+        """
+        for pattern, anchors in patterns:
+            if anchors:
+                if present is None:
+                    if not any(anchor in lowered for anchor in anchors):
+                        continue
+                elif present.isdisjoint(anchors):
+                    continue
+            match = pattern.search(lowered)
+            if match:
+                yield match
     
     def extract_all_parameters(self, text: str) -> Dict[str, Optional[str]]:
         """
@@ -88,121 +301,119 @@ class ParameterExtractor:
         Returns:
             Dict: Dizionario con tutti i parametri estratti
         """
-        # Preprocessa il testo
+        # Preprocessa il testo (già in minuscolo: gli estrattori privati
+        # non lo riconvertono)
         processed_text = self._preprocess_text(text)
         
+        # Senza cifre nessun pattern può corrispondere
+        if not _ANY_DIGIT.search(processed_text):
+            return dict.fromkeys(_PARAMETER_NAMES)
+        
+        # Parole letterali presenti, calcolate una volta per tutti gli estrattori
+        present = _anchors_in(processed_text)
+        
+        # Ogni parametro usa i propri pattern, provati in ordine di priorità
         return {
-            'blood_pressure': self.extract_blood_pressure(processed_text),
-            'heart_rate': self.extract_heart_rate(processed_text),
-            'glucose': self.extract_glucose(processed_text),
-            'saturation': self.extract_saturation(processed_text),
-            'temperature': self.extract_temperature(processed_text),
-            'weight': self.extract_weight(processed_text),
-            'height': self.extract_height(processed_text),
+            'blood_pressure': self._extract_blood_pressure(processed_text, present),
+            'heart_rate': self._extract_heart_rate(processed_text, present),
+            'glucose': self._extract_glucose(processed_text, present),
+            'saturation': self._extract_saturation(processed_text, present),
+            'temperature': self._extract_temperature(processed_text, present),
+            'weight': self._extract_weight(processed_text, present),
+            'height': self._extract_height(processed_text, present),
             'bmi': None  # Calcolato automaticamente se peso e altezza sono presenti
         }
     
     def _preprocess_text(self, text: str) -> str:
         """Preprocessa il testo per migliorare l'estrazione."""
-        # Converti in minuscolo
-        text = text.lower()
-        
-        # Normalizza spazi e punteggiatura
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'[,;]\s*', ' ', text)
-        
-        return text
+        # Minuscolo, virgole/punti e virgola come spazi e spazi normalizzati
+        # senza regex (split() senza argomenti compatta gli spazi)
+        text = text.lower().replace(',', ' ').replace(';', ' ')
+        return ' '.join(text.split())
     
     def extract_blood_pressure(self, text: str) -> Optional[str]:
         """Estrae la pressione arteriosa."""
-        for pattern in self.blood_pressure_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                if len(match.groups()) == 2:
-                    systolic, diastolic = match.groups()
-                    # Validazione: valori realistici
-                    if 70 <= int(systolic) <= 250 and 40 <= int(diastolic) <= 150:
-                        return f"{systolic}/{diastolic} mmHg"
+        return self._extract_blood_pressure(text.lower())
+    
+    def _extract_blood_pressure(self, lowered: str, present: Optional[frozenset] = None) -> Optional[str]:
+        """Estrae la pressione arteriosa da testo già in minuscolo."""
+        for match in self._matches(self.blood_pressure_patterns, lowered, present):
+            systolic, diastolic = match.groups()
+            return f"{systolic}/{diastolic} mmHg"
         return None
     
     def extract_heart_rate(self, text: str) -> Optional[str]:
         """Estrae la frequenza cardiaca."""
-        for pattern in self.heart_rate_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                rate = match.group(1)
-                # Validazione: valori realistici
-                if 40 <= int(rate) <= 200:
-                    return f"{rate} bpm"
+        return self._extract_heart_rate(text.lower())
+    
+    def _extract_heart_rate(self, lowered: str, present: Optional[frozenset] = None) -> Optional[str]:
+        """Estrae la frequenza cardiaca da testo già in minuscolo."""
+        for match in self._matches(self.heart_rate_patterns, lowered, present):
+            return f"{match.group(1)} bpm"
         return None
     
     def extract_glucose(self, text: str) -> Optional[str]:
         """Estrae la glicemia."""
-        for pattern in self.glucose_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                glucose = match.group(1)
-                # Validazione: valori realistici
-                if 50 <= int(glucose) <= 500:
-                    return f"{glucose} mg/dL"
+        return self._extract_glucose(text.lower())
+    
+    def _extract_glucose(self, lowered: str, present: Optional[frozenset] = None) -> Optional[str]:
+        """Estrae la glicemia da testo già in minuscolo."""
+        for match in self._matches(self.glucose_patterns, lowered, present):
+            return f"{match.group(1)} mg/dL"
         return None
     
     def extract_saturation(self, text: str) -> Optional[str]:
         """Estrae la saturazione di ossigeno."""
-        for pattern in self.saturation_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                saturation = match.group(1)
-                # Validazione: valori realistici
-                if 70 <= int(saturation) <= 100:
-                    return f"{saturation}%"
+        return self._extract_saturation(text.lower())
+    
+    def _extract_saturation(self, lowered: str, present: Optional[frozenset] = None) -> Optional[str]:
+        """Estrae la saturazione di ossigeno da testo già in minuscolo."""
+        for match in self._matches(self.saturation_patterns, lowered, present):
+            return f"{match.group(1)}%"
         return None
     
     def extract_temperature(self, text: str) -> Optional[str]:
         """Estrae la temperatura corporea."""
-        for pattern in self.temperature_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                temp = match.group(1)
-                temp_float = float(temp)
-                # Validazione: valori realistici (35-42°C)
-                if 35.0 <= temp_float <= 42.0:
-                    return f"{temp}°C"
+        return self._extract_temperature(text.lower())
+    
+    def _extract_temperature(self, lowered: str, present: Optional[frozenset] = None) -> Optional[str]:
+        """Estrae la temperatura corporea da testo già in minuscolo."""
+        for match in self._matches(self.temperature_patterns, lowered, present):
+            temp = match.group('val')
+            temp_float = float(temp)
+            # Validazione: valori realistici (35-42°C)
+            if 35.0 <= temp_float <= 42.0:
+                return f"{temp}°C"
         return None
     
     def extract_weight(self, text: str) -> Optional[str]:
         """Estrae il peso."""
-        for pattern in self.weight_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                weight = match.group(1)
-                weight_float = float(weight)
-                # Validazione: valori realistici (20-300 kg)
-                if 20.0 <= weight_float <= 300.0:
-                    return f"{weight} kg"
+        return self._extract_weight(text.lower())
+    
+    def _extract_weight(self, lowered: str, present: Optional[frozenset] = None) -> Optional[str]:
+        """Estrae il peso da testo già in minuscolo."""
+        for match in self._matches(self.weight_patterns, lowered, present):
+            weight = match.group('val')
+            weight_float = float(weight)
+            # Validazione: valori realistici (20-300 kg)
+            if 20.0 <= weight_float <= 300.0:
+                return f"{weight} kg"
         return None
     
     def extract_height(self, text: str) -> Optional[str]:
         """Estrae l'altezza in cm o m."""
-        for pattern in self.height_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                raw = match.group(0)
-                digits_only = re.findall(r'\d+(?:\.\d+)?', raw)
-                if not digits_only:
-                    continue
-                val = digits_only[0]
-                try:
-                    if 'm' in raw and float(val) < 3:  # Se < 3 metri, assumi metri
-                        cm = int(float(val) * 100)
-                        if 100 <= cm <= 250:
-                            return f"{cm} cm"
-                    else:  # Assumi centimetri
-                        cm = int(float(val))
-                        if 100 <= cm <= 250:
-                            return f"{cm} cm"
-                except ValueError:
-                    continue
+        return self._extract_height(text.lower())
+    
+    def _extract_height(self, lowered: str, present: Optional[frozenset] = None) -> Optional[str]:
+        """Estrae l'altezza in cm o m da testo già in minuscolo."""
+        for match in self._matches(self.height_patterns, lowered, present):
+            val, unit = match.group('val'), match.groupdict().get('unit')
+            if unit == 'm':  # Valore in metri
+                cm = int(float(val) * 100)
+            else:  # Assumi centimetri
+                cm = int(val)
+            if 100 <= cm <= 250:
+                return f"{cm} cm"
         return None
 
 
@@ -222,9 +433,9 @@ class ParameterExtractor:
             return None
         
         try:
-            # Estrai valori numerici
-            weight_kg = float(re.search(r'([\d.]+)', weight).group(1))
-            height_cm = float(re.search(r'(\d+)', height).group(1))
+            # Estrai valori numerici ("XX kg", "XXX cm", anche "70kg")
+            weight_kg = float(weight.split()[0].rstrip(ascii_letters))
+            height_cm = float(height.split()[0].rstrip(ascii_letters))
             
             # Converti altezza in metri
             height_m = height_cm / 100
@@ -234,7 +445,7 @@ class ParameterExtractor:
             
             return f"{bmi:.1f}"
             
-        except (ValueError, AttributeError):
+        except (ValueError, IndexError):
             return None
     
     def get_extraction_stats(self, parameters: Dict[str, Optional[str]]) -> Dict[str, int]:
@@ -248,10 +459,26 @@ class ParameterExtractor:
             Dict: Statistiche di estrazione
         """
         total_params = len(parameters)
-        extracted_params = sum(1 for v in parameters.values() if v is not None)
+        extracted_params = sum(v is not None for v in parameters.values())
         
         return {
             'total_parameters': total_params,
             'extracted_parameters': extracted_params,
-            'extraction_rate': round((extracted_params / total_params) * 100, 1)
-        }
\ No newline at end of file
+            'extraction_rate': round(extracted_params * 100.0 / total_params, 1) if total_params else 0.0
+        }
+
+
+_DEFAULT_EXTRACTOR: Optional[ParameterExtractor] = None
+
+
+def get_extractor() -> ParameterExtractor:
+    """
+    Restituisce l'estrattore condiviso del processo, creandolo al primo uso.
+    
+    Returns:
+        ParameterExtractor: Istanza condivisa (senza stato, riutilizzabile)
+    """
+    global _DEFAULT_EXTRACTOR
+    if _DEFAULT_EXTRACTOR is None:
+        _DEFAULT_EXTRACTOR = ParameterExtractor()
+    return _DEFAULT_EXTRACTOR
\ No newline at end of file
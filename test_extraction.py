@@ -6,7 +6,7 @@ Script per testare l'estrazione di parametri da testo di esempio.
 """
 
 import json
-from parameter_extractor import ParameterExtractor
+from parameter_extractor import get_extractor
 from json_output import JSONOutputGenerator
 
 
@@ -52,7 +52,7 @@ def test_parameter_extraction():
         """
     ]
     
-    extractor = ParameterExtractor()
+    extractor = get_extractor()
     json_generator = JSONOutputGenerator()
     
     print("🧪 TEST ESTRAZIONE PARAMETRI VITALI")
@@ -156,13 +156,35 @@ def test_json_generation():
     print("💾 JSON salvato in 'test_output.json'")
 
 
+def test_classifications():
+    """Testa le classificazioni cliniche su valori formattati dall'estrattore."""
+    
+    print("\n🏥 TEST CLASSIFICAZIONI")
+    print("=" * 50)
+    
+    json_generator = JSONOutputGenerator()
+    
+    # (classificatore, valore, stato atteso)
+    test_cases = [
+        (json_generator._classify_blood_pressure, '135/85 mmHg', 'high_stage1'),
+        (json_generator._classify_temperature, '36.7°C', 'normal'),
+        (json_generator._classify_temperature, '37.°C', 'normal'),  # es. "Temperatura: 37. Paziente stabile"
+        (json_generator._classify_temperature, '38.°C', 'mild_fever'),
+    ]
+    
+    for classify, value, expected in test_cases:
+        result = classify(value)
+        status = "✅" if result == expected else "❌"
+        print(f"  {status} '{value}' -> {result} (atteso: {expected})")
+
+
 def run_regex_tests():
     """Testa i pattern regex individualmente."""
     
     print("\n🔍 TEST PATTERN REGEX")
     print("=" * 50)
     
-    extractor = ParameterExtractor()
+    extractor = get_extractor()
     
     # Test cases per ogni parametro
     test_cases = {
@@ -170,13 +192,21 @@ def run_regex_tests():
             "Pressione arteriosa 120/80 mmHg",
             "PA: 135/85 mmHg",
             "Press. 110/70",
-            "Sistolica 140, diastolica 90"
+            "Sistolica 140, diastolica 90",
+            # Limiti dell'intervallo valido e valori fuori intervallo
+            "PA 250/150 mmHg",
+            "PA 251/80 mmHg",  # -> None
+            "PA 300/80 mmHg poi 120/80 mmHg"  # -> 120/80 mmHg
         ],
         'Frequenza Cardiaca': [
             "Frequenza cardiaca 75 bpm",
             "FC: 68 bpm",
             "Polso 82 battiti",
-            "Battiti cardiaci: 90"
+            "Battiti cardiaci: 90",
+            # Limiti dell'intervallo valido e valori fuori intervallo
+            "FC 39 bpm",  # -> None
+            "FC 40 bpm",
+            "fc 1200"  # -> None
         ],
         'Glicemia': [
             "Glicemia 95 mg/dL",
@@ -217,6 +247,7 @@ if __name__ == "__main__":
         # Esegui tutti i test
         test_parameter_extraction()
         test_json_generation()
+        test_classifications()
         run_regex_tests()
         
         print("\n🎉 TUTTI I TEST COMPLETATI CON SUCCESSO!")